@@ -1,8 +1,33 @@
 import pandas as pd
-import openpyxl
+import numpy as np
 from openpyxl.styles import PatternFill, Font
+from openpyxl.formatting.rule import FormulaRule
 import sys
 
+# Prefer the Rust-based calamine reader (pandas 2.2+), fall back to openpyxl
+try:
+    import python_calamine  # noqa: F401
+    EXCEL_ENGINE = 'calamine'
+except ImportError:
+    EXCEL_ENGINE = 'openpyxl'
+
+# Prefer xlsxwriter for the report, fall back to openpyxl
+try:
+    import xlsxwriter  # noqa: F401
+    REPORT_ENGINE = 'xlsxwriter'
+except ImportError:
+    REPORT_ENGINE = 'openpyxl'
+
+# Report formatting shared by both report engines
+HEADER_BG_COLOR = '4472C4'
+HEADER_FONT_COLOR = 'FFFFFF'
+STATUS_COLORS = [
+    ('VALUE_MISMATCH', 'FFE699'),
+    ('MISSING_IN_POLITICAL', 'C6E0B4'),
+    ('MISSING_IN_MIGRATE', 'F4B084')
+]
+COLUMN_WIDTHS = {'A': 30, 'B': 20, 'C': 25, 'D': 25, 'E': 20, 'F': 20}
+
 def list_file_columns(file_path):
     """
     List all columns available in an Excel file.
@@ -11,7 +36,7 @@ def list_file_columns(file_path):
         file_path: Path to Excel file
     """
     try:
-        df = pd.read_excel(file_path)
+        df = pd.read_excel(file_path, engine=EXCEL_ENGINE, nrows=0)
         print(f"\nColumns in '{file_path}':")
         for idx, col in enumerate(df.columns, 1):
             print(f"  {idx}. {col}")
@@ -20,7 +45,91 @@ def list_file_columns(file_path):
         print(f"✗ Error reading file: {e}")
         return []
 
-def compare_excel_files(file1_path, file2_path, output_path, match_columns=None):
+def read_excel_file(file_path, usecols=None):
+    """
+    Read the first sheet of an Excel file, loading only the columns that are needed.
+    
+    Args:
+        file_path: Path to Excel file
+        usecols: Optional list of columns to load; other columns are skipped
+    """
+    return pd.read_excel(
+        file_path,
+        engine=EXCEL_ENGINE,
+        usecols=None if usecols is None else (lambda col: col in usecols)
+    )
+
+def build_composite_key(index):
+    """
+    Join the levels of a composite key index into '_'-separated strings for reporting.
+    
+    Args:
+        index: Index or MultiIndex built from the match columns
+    """
+    key = pd.Series(index.get_level_values(0)).astype(str)
+    for level in range(1, index.nlevels):
+        key = key.str.cat(pd.Series(index.get_level_values(level)).astype(str), sep='_')
+    return key.to_numpy()
+
+def save_report(results_df, output_path):
+    """
+    Write the discrepancy report with a styled header and status colours.
+    
+    Args:
+        results_df: DataFrame of discrepancies (Status is the 5th column)
+        output_path: Path to save the report
+    """
+    with pd.ExcelWriter(output_path, engine=REPORT_ENGINE) as writer:
+        results_df.to_excel(writer, index=False, sheet_name='Discrepancies')
+        ws = writer.sheets['Discrepancies']
+        
+        if REPORT_ENGINE == 'xlsxwriter':
+            workbook = writer.book
+            
+            # Header formatting
+            header_fmt = workbook.add_format({
+                'bold': True, 'font_color': f'#{HEADER_FONT_COLOR}', 'bg_color': f'#{HEADER_BG_COLOR}'
+            })
+            for col_idx, col_name in enumerate(results_df.columns):
+                ws.write(0, col_idx, col_name, header_fmt)
+            
+            # Color coding for status, as conditional formats rather than per-cell fills
+            if len(results_df) > 0:
+                for status, color in STATUS_COLORS:
+                    ws.conditional_format(1, 4, len(results_df), 4, {
+                        'type': 'text',
+                        'criteria': 'containing',
+                        'value': status,
+                        'format': workbook.add_format({'bg_color': f'#{color}'})
+                    })
+            
+            # Adjust column widths
+            for col_letter, width in COLUMN_WIDTHS.items():
+                ws.set_column(f'{col_letter}:{col_letter}', width)
+        else:
+            # Header formatting
+            header_fill = PatternFill(start_color=HEADER_BG_COLOR, end_color=HEADER_BG_COLOR, fill_type='solid')
+            header_font = Font(bold=True, color=HEADER_FONT_COLOR)
+            for cell in ws[1]:
+                cell.fill = header_fill
+                cell.font = header_font
+            
+            # Color coding for status, as conditional formats rather than per-cell fills
+            if len(results_df) > 0:
+                status_range = f'E2:E{len(results_df) + 1}'
+                for status, color in STATUS_COLORS:
+                    fill = PatternFill(start_color=color, end_color=color, fill_type='solid')
+                    ws.conditional_formatting.add(
+                        status_range,
+                        FormulaRule(formula=[f'NOT(ISERROR(SEARCH("{status}",E2)))'], fill=fill)
+                    )
+            
+            # Adjust column widths
+            for col_letter, width in COLUMN_WIDTHS.items():
+                ws.column_dimensions[col_letter].width = width
+
+def compare_excel_files(file1_path, file2_path, output_path, match_columns=None, verbose=False,
+                        compare_columns=None):
     """
     Compare two Excel files using multiple columns as composite key.
     
@@ -29,19 +138,26 @@ def compare_excel_files(file1_path, file2_path, output_path, match_columns=None)
         file2_path: Path to second Excel file
         output_path: Path to save the comparison report
         match_columns: List of columns to use as composite key for matching (e.g., ['REGION', 'CONSTITUENCY'])
+        verbose: Print every discrepancy instead of only the first 30
+        compare_columns: Optional list of columns to compare; other columns are not loaded
     """
     
     try:
+        if match_columns is None:
+            match_columns = ['REGION', 'CONSTITUENCY']
+        
+        # Only load the columns being compared
+        usecols = None
+        if compare_columns is not None:
+            usecols = list(match_columns) + [col for col in compare_columns if col not in match_columns]
+        
         # Read Excel files
-        df1 = pd.read_excel(file1_path)
-        df2 = pd.read_excel(file2_path)
+        df1 = read_excel_file(file1_path, usecols=usecols)
+        df2 = read_excel_file(file2_path, usecols=usecols)
         
         print(f"✓ Loaded {file1_path}: {len(df1)} rows")
         print(f"✓ Loaded {file2_path}: {len(df2)} rows")
         
-        if match_columns is None:
-            match_columns = ['REGION', 'CONSTITUENCY']
-        
         # Ensure all match columns exist in both files
         for col in match_columns:
             if col not in df1.columns or col not in df2.columns:
@@ -51,13 +167,17 @@ def compare_excel_files(file1_path, file2_path, output_path, match_columns=None)
                 list_file_columns(file2_path)
                 return
         
-        # Create composite key from match columns
-        df1['_COMPOSITE_KEY'] = df1[match_columns].astype(str).agg('_'.join, axis=1)
-        df2['_COMPOSITE_KEY'] = df2[match_columns].astype(str).agg('_'.join, axis=1)
+        # Use the stringified match columns as a composite (Multi)Index, so a key stored as
+        # a number in one file still matches the same key stored as text in the other.
+        # Passing Series rather than column names keeps the match columns as fields too.
+        df1_indexed = df1.set_index([df1[col].astype(str) for col in match_columns])
+        df2_indexed = df2.set_index([df2[col].astype(str) for col in match_columns])
         
-        # Check for duplicates
-        duplicates1 = df1['_COMPOSITE_KEY'].duplicated().sum()
-        duplicates2 = df2['_COMPOSITE_KEY'].duplicated().sum()
+        # Check for duplicates (one hash pass per file; the mask is reused for dedup)
+        duplicated1 = df1_indexed.index.duplicated(keep='first')
+        duplicated2 = df2_indexed.index.duplicated(keep='first')
+        duplicates1 = int(duplicated1.sum())
+        duplicates2 = int(duplicated2.sum())
         
         if duplicates1 > 0:
             print(f"\n⚠ WARNING: Found {duplicates1} duplicate REGION+CONSTITUENCY combinations in {file1_path}")
@@ -66,102 +186,85 @@ def compare_excel_files(file1_path, file2_path, output_path, match_columns=None)
         
         # Group by composite key and aggregate (keep first occurrence or summarize)
         # For this comparison, we'll keep the first occurrence
-        df1_deduped = df1.drop_duplicates(subset='_COMPOSITE_KEY', keep='first')
-        df2_deduped = df2.drop_duplicates(subset='_COMPOSITE_KEY', keep='first')
+        df1_indexed = df1_indexed[~duplicated1]
+        df2_indexed = df2_indexed[~duplicated2]
         
-        print(f"\n✓ After deduplication: {len(df1_deduped)} unique records in {file1_path}")
-        print(f"✓ After deduplication: {len(df2_deduped)} unique records in {file2_path}")
+        print(f"\n✓ After deduplication: {len(df1_indexed)} unique records in {file1_path}")
+        print(f"✓ After deduplication: {len(df2_indexed)} unique records in {file2_path}")
         
-        # Set composite key as index
-        df1_indexed = df1_deduped.set_index('_COMPOSITE_KEY')
-        df2_indexed = df2_deduped.set_index('_COMPOSITE_KEY')
+        # Split keys into those present in both files and those present in only one
+        in_both = df1_indexed.index.intersection(df2_indexed.index, sort=False)
+        only_in_file1 = df1_indexed.index.difference(df2_indexed.index, sort=False)
+        only_in_file2 = df2_indexed.index.difference(df1_indexed.index, sort=False)
         
-        # Initialize results list
-        mismatches = []
+        print(f"✓ Total unique combinations to compare: {len(in_both) + len(only_in_file1) + len(only_in_file2)}")
         
-        # Get all unique keys from both files
-        all_keys = set(df1_indexed.index) | set(df2_indexed.index)
+        # Get all columns from both files, sorted
+        all_cols = df1_indexed.columns.union(df2_indexed.columns)
+        result_columns = ['Match_Key', 'Field', 'MIGRATE_Value', 'POLITICAL_Value', 'Status', 'File_Source']
         
-        print(f"✓ Total unique combinations to compare: {len(all_keys)}")
+        # Convert NaN to 'MISSING' and every value to its string form in one columnwise pass
+        df1_str = df1_indexed.astype(object).where(df1_indexed.notna(), 'MISSING').astype(str)
+        df2_str = df2_indexed.astype(object).where(df2_indexed.notna(), 'MISSING').astype(str)
         
-        # Compare each record
-        for key in sorted(all_keys):
-            in_file1 = key in df1_indexed.index
-            in_file2 = key in df2_indexed.index
-            
-            if in_file1 and in_file2:
-                # Record exists in both files - check for differences
-                row1 = df1_indexed.loc[key]
-                row2 = df2_indexed.loc[key]
-                
-                # Handle case where loc might still return Series (shouldn't happen after dedup, but safe)
-                if isinstance(row1, pd.DataFrame):
-                    row1 = row1.iloc[0]
-                if isinstance(row2, pd.DataFrame):
-                    row2 = row2.iloc[0]
-                
-                # Get all columns from both files (excluding the composite key)
-                all_cols = set(df1_deduped.columns) | set(df2_deduped.columns)
-                all_cols.discard('_COMPOSITE_KEY')
-                
-                for col in sorted(all_cols):
-                    val1 = row1.get(col) if col in row1.index else None
-                    val2 = row2.get(col) if col in row2.index else None
-                    
-                    # Convert NaN to string for comparison
-                    val1_str = str(val1) if pd.notna(val1) else 'MISSING'
-                    val2_str = str(val2) if pd.notna(val2) else 'MISSING'
-                    
-                    if val1_str != val2_str:
-                        mismatches.append({
-                            'Match_Key': key,
-                            'Field': col,
-                            'MIGRATE_Value': val1_str,
-                            'POLITICAL_Value': val2_str,
-                            'Status': 'VALUE_MISMATCH',
-                            'File_Source': 'Both'
-                        })
-            
-            elif in_file1 and not in_file2:
-                # Record only in file 1
-                row1 = df1_indexed.loc[key]
-                if isinstance(row1, pd.DataFrame):
-                    row1 = row1.iloc[0]
-                    
-                for col in sorted(df1_deduped.columns):
-                    if col != '_COMPOSITE_KEY':
-                        val1 = row1.get(col) if col in row1.index else None
-                        val1_str = str(val1) if pd.notna(val1) else 'MISSING'
-                        mismatches.append({
-                            'Match_Key': key,
-                            'Field': col,
-                            'MIGRATE_Value': val1_str,
-                            'POLITICAL_Value': 'N/A - RECORD_NOT_IN_FILE',
-                            'Status': 'MISSING_IN_POLITICAL',
-                            'File_Source': 'MIGRATE only'
-                        })
-            
+        # Records in both files: align the two sides on their shared keys once
+        both1, both2 = df1_str.align(df2_str, join='inner', axis=0)
+        shared_cols = df1_str.columns.intersection(df2_str.columns)
+        
+        match_keys = build_composite_key(both1.index)
+        
+        # Compare column by column, collecting one partial frame per mismatching column
+        parts = []
+        for col in all_cols:
+            if col in shared_cols:
+                # One contiguous string compare per column; identical columns yield no rows
+                values1 = both1[col].to_numpy()
+                values2 = both2[col].to_numpy()
+                mask = values1 != values2
+                val1_str = values1[mask]
+                val2_str = values2[mask]
             else:
-                # Record only in file 2
-                row2 = df2_indexed.loc[key]
-                if isinstance(row2, pd.DataFrame):
-                    row2 = row2.iloc[0]
-                    
-                for col in sorted(df2_deduped.columns):
-                    if col != '_COMPOSITE_KEY':
-                        val2 = row2.get(col) if col in row2.index else None
-                        val2_str = str(val2) if pd.notna(val2) else 'MISSING'
-                        mismatches.append({
-                            'Match_Key': key,
-                            'Field': col,
-                            'MIGRATE_Value': 'N/A - RECORD_NOT_IN_FILE',
-                            'POLITICAL_Value': val2_str,
-                            'Status': 'MISSING_IN_MIGRATE',
-                            'File_Source': 'POLITICAL only'
-                        })
-        
-        # Create results DataFrame
-        results_df = pd.DataFrame(mismatches)
+                # Columns absent from a file count as MISSING
+                values = (both1 if col in df1_str.columns else both2)[col].to_numpy()
+                mask = values != 'MISSING'
+                missing = np.full(mask.sum(), 'MISSING', dtype=object)
+                val1_str = values[mask] if col in df1_str.columns else missing
+                val2_str = missing if col in df1_str.columns else values[mask]
+            
+            if mask.any():
+                parts.append(pd.DataFrame({
+                    'Match_Key': match_keys[mask],
+                    'Field': col,
+                    'MIGRATE_Value': val1_str,
+                    'POLITICAL_Value': val2_str,
+                    'Status': 'VALUE_MISMATCH',
+                    'File_Source': 'Both'
+                }))
+        
+        # Records only in one file - emit one row per field they have in a single reshape
+        for only_keys, df_str, value_col, other_col, status, source in [
+            (only_in_file1, df1_str, 'MIGRATE_Value', 'POLITICAL_Value', 'MISSING_IN_POLITICAL', 'MIGRATE only'),
+            (only_in_file2, df2_str, 'POLITICAL_Value', 'MIGRATE_Value', 'MISSING_IN_MIGRATE', 'POLITICAL only')
+        ]:
+            if len(only_keys) == 0:
+                continue
+            values = df_str.loc[only_keys].to_numpy()
+            n_rows, n_cols = values.shape
+            parts.append(pd.DataFrame({
+                'Match_Key': np.repeat(build_composite_key(only_keys), n_cols),
+                'Field': np.tile(df_str.columns.to_numpy(), n_rows),
+                value_col: values.ravel(),
+                other_col: 'N/A - RECORD_NOT_IN_FILE',
+                'Status': status,
+                'File_Source': source
+            })[result_columns])
+        
+        # Create results DataFrame; keys are left unsorted above, so order once here
+        if parts:
+            results_df = pd.concat(parts, ignore_index=True)
+            results_df.sort_values(['Match_Key', 'Field'], inplace=True, ignore_index=True)
+        else:
+            results_df = pd.DataFrame(columns=result_columns)
         
         if len(results_df) == 0:
             print("\n✓ No mismatches found! Both files are identical.")
@@ -172,50 +275,17 @@ def compare_excel_files(file1_path, file2_path, output_path, match_columns=None)
             for status, count in status_counts.items():
                 print(f"  - {status}: {count}")
             
-            print("\nFirst 30 discrepancies:")
-            print(results_df.head(30).to_string(index=False))
+            if verbose:
+                print("\nAll discrepancies:")
+                print(results_df.to_string(index=False))
+            else:
+                print("\nFirst 30 discrepancies:")
+                print(results_df.head(30).to_string(index=False))
+                if len(results_df) > 30:
+                    print(f"... ({len(results_df)} total rows)")
         
         # Save to Excel with formatting
-        results_df.to_excel(output_path, index=False, sheet_name='Discrepancies')
-        
-        # Apply formatting to output file
-        wb = openpyxl.load_workbook(output_path)
-        ws = wb.active
-        
-        # Header formatting
-        header_fill = PatternFill(start_color='4472C4', end_color='4472C4', fill_type='solid')
-        header_font = Font(bold=True, color='FFFFFF')
-        
-        for cell in ws[1]:
-            cell.fill = header_fill
-            cell.font = header_font
-        
-        # Color coding for status
-        value_mismatch_fill = PatternFill(start_color='FFE699', end_color='FFE699', fill_type='solid')
-        missing_political_fill = PatternFill(start_color='C6E0B4', end_color='C6E0B4', fill_type='solid')
-        missing_migrate_fill = PatternFill(start_color='F4B084', end_color='F4B084', fill_type='solid')
-        
-        for row_idx, row in enumerate(ws.iter_rows(min_row=2, max_row=ws.max_row), start=2):
-            status_cell = row[4]  # Status column (5th column)
-            status = status_cell.value
-            
-            if status:
-                if 'VALUE_MISMATCH' in status:
-                    status_cell.fill = value_mismatch_fill
-                elif 'MISSING_IN_POLITICAL' in status:
-                    status_cell.fill = missing_political_fill
-                elif 'MISSING_IN_MIGRATE' in status:
-                    status_cell.fill = missing_migrate_fill
-        
-        # Adjust column widths
-        ws.column_dimensions['A'].width = 30
-        ws.column_dimensions['B'].width = 20
-        ws.column_dimensions['C'].width = 25
-        ws.column_dimensions['D'].width = 25
-        ws.column_dimensions['E'].width = 20
-        ws.column_dimensions['F'].width = 20
-        
-        wb.save(output_path)
+        save_report(results_df, output_path)
         print(f"\n✓ Report saved to: {output_path}")
         
     except FileNotFoundError as e: